@@ -1,13 +1,16 @@
 import json
 import sys
-import time
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from config import IG_USERNAME, IG_PASSWORD, COOKIES_FILE
+from config import IG_USERNAME, IG_PASSWORD, COOKIES_FILE, CHROME_PROFILE_DIR
+
+# How long find_element(s) polls for an element before giving up
+IMPLICIT_WAIT_SECONDS = 5
 
 
 def get_browser():
@@ -20,6 +23,19 @@ def get_browser():
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option("useAutomationExtension", False)
     options.add_argument("--window-size=1280,900")
+    # Reuse the same profile every run so cookies and cached assets survive
+    CHROME_PROFILE_DIR.mkdir(exist_ok=True)
+    options.add_argument(f"--user-data-dir={CHROME_PROFILE_DIR}")
+    options.add_argument("--profile-directory=Default")
+    # Return from driver.get() at DOMContentLoaded instead of waiting for every
+    # image/video; the code waits explicitly for the elements it needs
+    options.page_load_strategy = "eager"
+    # Don't download images (profile grids, avatars) or ask for notifications
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    options.add_argument("--blink-settings=imagesEnabled=false")
 
     try:
         driver = webdriver.Chrome(options=options)
@@ -30,6 +46,9 @@ def get_browser():
         print("  Selenium 4 auto-downloads chromedriver, so you only need Chrome itself.")
         sys.exit(1)
 
+    # Every find_element(s) call polls up to 5s for its element, so no blind sleeps are needed
+    driver.implicitly_wait(IMPLICIT_WAIT_SECONDS)
+
     # Remove the "controlled by automated software" indicator
     try:
         driver.execute_cdp_cmd(
@@ -41,6 +60,16 @@ def get_browser():
     return driver
 
 
+@contextmanager
+def no_implicit_wait(driver):
+    """Turn the implicit wait off for lookups that usually find nothing."""
+    driver.implicitly_wait(0)
+    try:
+        yield
+    finally:
+        driver.implicitly_wait(IMPLICIT_WAIT_SECONDS)
+
+
 def save_cookies(driver):
     """Save browser cookies to file for session reuse."""
     cookies = driver.get_cookies()
@@ -48,6 +77,22 @@ def save_cookies(driver):
         json.dump(cookies, f)
 
 
+def _to_cdp_cookie(cookie):
+    """Convert a Selenium cookie dict into the shape CDP's Network.setCookies expects."""
+    cdp_cookie = {
+        k: cookie[k]
+        for k in ("name", "value", "domain", "path", "secure", "httpOnly")
+        if k in cookie
+    }
+    if "expiry" in cookie:
+        cdp_cookie["expires"] = cookie["expiry"]
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        cdp_cookie["sameSite"] = cookie["sameSite"]
+    if "domain" not in cdp_cookie:
+        cdp_cookie["url"] = "https://www.instagram.com/"
+    return cdp_cookie
+
+
 def load_cookies(driver):
     """Load saved cookies into the browser."""
     if not COOKIES_FILE.exists():
@@ -55,8 +100,22 @@ def load_cookies(driver):
     try:
         with open(COOKIES_FILE, "r") as f:
             cookies = json.load(f)
+    except Exception:
+        return False
+
+    # Push every cookie in a single CDP call instead of one round-trip each
+    try:
+        driver.execute_cdp_cmd(
+            "Network.setCookies",
+            {"cookies": [_to_cdp_cookie(c) for c in cookies]},
+        )
+        return True
+    except Exception:
+        pass
+
+    # Fallback: add_cookie one at a time (needs to be on the domain first)
+    try:
         driver.get("https://www.instagram.com/")
-        time.sleep(3)
         for cookie in cookies:
             cookie.pop("sameSite", None)
             cookie.pop("storeId", None)
@@ -72,12 +131,10 @@ def load_cookies(driver):
 def is_logged_in(driver):
     """Check if we're logged into Instagram."""
     driver.get("https://www.instagram.com/")
-    time.sleep(4)
-    try:
-        driver.find_element(By.NAME, "username")
-        return False  # login form found = not logged in
-    except Exception:
-        return True  # no login form = logged in
+    # The implicit wait polls until either the login form or the feed's nav bar shows up
+    driver.find_elements(By.XPATH, "//input[@name='username'] | //nav")
+    # login form found = not logged in, no login form = logged in
+    return not driver.execute_script("return !!document.querySelector('input[name=\"username\"]');")
 
 
 def login(driver):
@@ -89,7 +146,14 @@ def login(driver):
     """
     print("[Login] Opening Instagram login page...")
     driver.get("https://www.instagram.com/accounts/login/")
-    time.sleep(5)
+    # Explicit wait only - mixing it with the implicit wait makes the timeout unpredictable
+    try:
+        with no_implicit_wait(driver):
+            username_field = WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.NAME, "username"))
+            )
+    except Exception:
+        username_field = None
 
     if not IG_USERNAME or not IG_PASSWORD:
         print()
@@ -101,25 +165,16 @@ def login(driver):
     # Auto-fill credentials
     try:
         print("[Login] Entering credentials...")
-        username_field = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.NAME, "username"))
-        )
-        # Type slowly to look more human
+        if username_field is None:
+            raise RuntimeError("login form did not load")
         username_field.clear()
-        for char in IG_USERNAME:
-            username_field.send_keys(char)
-            time.sleep(0.05)
-
-        time.sleep(1)
+        username_field.send_keys(IG_USERNAME)
 
-        password_field = driver.find_element(By.NAME, "password")
+        # Rendered together with the username field, so no need to wait for it
+        with no_implicit_wait(driver):
+            password_field = driver.find_element(By.NAME, "password")
         password_field.clear()
-        for char in IG_PASSWORD:
-            password_field.send_keys(char)
-            time.sleep(0.05)
-
-        time.sleep(1)
-        password_field.send_keys(Keys.ENTER)
+        password_field.send_keys(IG_PASSWORD, Keys.ENTER)
         print("[Login] Credentials submitted.")
 
     except Exception as e:
@@ -145,27 +200,38 @@ def login(driver):
 
 
 def _dismiss_popups(driver):
-    """Dismiss common post-login popups."""
-    for text in ["Not Now", "Not now"]:
-        try:
-            buttons = driver.find_elements(By.XPATH, f"//button[contains(text(), '{text}')]")
-            for btn in buttons:
-                btn.click()
-                time.sleep(2)
+    """Dismiss common post-login popups ("Save login info?", "Turn on notifications?")."""
+    xpath = "//button[contains(text(), 'Not Now') or contains(text(), 'Not now')]"
+    # Usually there's no popup, so don't let the implicit wait hold things up
+    with no_implicit_wait(driver):
+        buttons = driver.find_elements(By.XPATH, xpath)
+        for _ in range(2):
+            if not buttons:
+                break
+            try:
+                buttons[0].click()
+                # Give a second popup a moment to appear
+                buttons = WebDriverWait(driver, 2).until(lambda d: d.find_elements(By.XPATH, xpath))
+            except Exception:
                 break
-        except Exception:
-            pass
 
 
 def get_logged_in_browser():
     """
     Return a browser that's logged into Instagram.
 
-    Tries saved cookies first, falls back to login.
+    Tries the persistent Chrome profile first, then saved cookies,
+    then falls back to login.
     """
     driver = get_browser()
 
-    # Try cookies first
+    # The persistent profile usually still has a live session
+    if is_logged_in(driver):
+        print("[Browser] Resumed session from Chrome profile.")
+        _dismiss_popups(driver)
+        return driver
+
+    # Try cookies next (legacy / portable sessions)
     if COOKIES_FILE.exists():
         print("[Browser] Loading saved session...")
         if load_cookies(driver) and is_logged_in(driver):
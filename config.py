@@ -1,4 +1,5 @@
 import os
+from collections import Counter
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -8,16 +9,24 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent
 COOKIES_FILE = BASE_DIR / "cookies.json"
 CSV_FILE = BASE_DIR / "following.csv"
+# Persistent Chrome profile (keeps cookies + HTTP cache between runs; don't commit it)
+CHROME_PROFILE_DIR = BASE_DIR / "chrome_profile"
 
 # Instagram credentials from .env (used for automated login)
 IG_USERNAME = os.getenv("INSTAGRAM_USERNAME", "")
 IG_PASSWORD = os.getenv("INSTAGRAM_PASSWORD", "")
 
+# App ID Instagram's web client sends with its own API requests (x-ig-app-id)
+IG_WEB_APP_ID = "936619743392459"
+
 # Rate-limiting defaults (all overridable via .env)
 DAILY_UNFOLLOW_LIMIT = int(os.getenv("DAILY_UNFOLLOW_LIMIT", "500"))
 MIN_DELAY_SECONDS = int(os.getenv("MIN_DELAY_SECONDS", "5"))
 MAX_DELAY_SECONDS = int(os.getenv("MAX_DELAY_SECONDS", "15"))
 
+# Rewrite the CSV every N unfollows (and always on exit/interrupt)
+CSV_SAVE_EVERY = 25
+
 # CSV column names (single source of truth)
 CSV_COLUMNS = ["username", "user_id", "full_name", "follows_you", "status", "date_unfollowed"]
 
@@ -26,3 +35,8 @@ STATUS_KEEP = "keep"
 STATUS_UNFOLLOW = "unfollow"
 STATUS_UNFOLLOWED = "unfollowed"
 STATUS_SKIPPED = "skipped"
+
+
+def tally_statuses(statuses):
+    """Count how often each status value occurs, in one pass."""
+    return Counter(statuses)
@@ -14,7 +14,7 @@ Usage:
 import argparse
 import csv
 import sys
-from config import CSV_FILE, CSV_COLUMNS, STATUS_KEEP, STATUS_UNFOLLOW, STATUS_UNFOLLOWED, STATUS_SKIPPED
+from config import CSV_FILE, CSV_COLUMNS, STATUS_KEEP, STATUS_UNFOLLOW, STATUS_UNFOLLOWED, STATUS_SKIPPED, tally_statuses
 
 
 def cmd_login(args):
@@ -74,15 +74,19 @@ def cmd_status(args):
         print("  Run 'python main.py import-json <file>' first.")
         return
 
+    # Only the status column is needed, so skip building a dict per row
     with open(CSV_FILE, "r", newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-
-    total = len(rows)
-    keep = sum(1 for r in rows if r["status"] == STATUS_KEEP)
-    unfollow = sum(1 for r in rows if r["status"] == STATUS_UNFOLLOW)
-    unfollowed = sum(1 for r in rows if r["status"] == STATUS_UNFOLLOWED)
-    skipped = sum(1 for r in rows if r["status"] == STATUS_SKIPPED)
-    blank = sum(1 for r in rows if r["status"] == "")
+        reader = csv.reader(f)
+        status_idx = next(reader, CSV_COLUMNS).index("status")
+        # Short rows count toward the total but not as unmarked (None, like DictReader)
+        counts = tally_statuses(row[status_idx] if len(row) > status_idx else None for row in reader if row)
+
+    total = sum(counts.values())
+    keep = counts[STATUS_KEEP]
+    unfollow = counts[STATUS_UNFOLLOW]
+    unfollowed = counts[STATUS_UNFOLLOWED]
+    skipped = counts[STATUS_SKIPPED]
+    blank = counts[""]
 
     print(f"[Status] CSV: {CSV_FILE}")
     print(f"  Total rows:    {total}")
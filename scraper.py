@@ -1,8 +1,32 @@
 import csv
 import json
 import sys
+import time
+from collections import Counter
 from pathlib import Path
-from config import CSV_FILE, CSV_COLUMNS, STATUS_UNFOLLOWED
+import ijson
+from config import CSV_FILE, CSV_COLUMNS, STATUS_KEEP, STATUS_UNFOLLOW, STATUS_UNFOLLOWED, tally_statuses
+
+# Looks up a small batch of usernames in parallel via Instagram's search
+# endpoint, from inside the logged-in page. Returns [http_status, user_id]
+# per username, in order (user_id is null where there was no exact match;
+# status 0 means the request itself failed).
+RESOLVE_USER_IDS_JS = """
+    return Promise.all(arguments[0].map(username =>
+        fetch('/web/search/topsearch/?query=' + encodeURIComponent(username),
+              {credentials: 'include'})
+            .then(r => {
+                if (!r.ok) return [r.status, null];
+                return r.json().then(j => {
+                    for (var u of (j.users || [])) {
+                        if (u.user && u.user.username === username) return [r.status, String(u.user.pk)];
+                    }
+                    return [r.status, null];
+                });
+            })
+            .catch(() => [0, null])
+    ));
+"""
 
 
 def _extract_username(entry):
@@ -35,6 +59,52 @@ def _extract_username(entry):
     return None
 
 
+def _iter_json_entries(path, key, any_list=False):
+    """
+    Yield entries from an Instagram data download JSON file one at a time.
+
+    Streams with ijson so large files are never fully loaded. Handles both
+    a bare top-level list and a list under `key`. If nothing is found there,
+    falls back to json.load and (with any_list=True) uses the first list value.
+    Raises ValueError if the file has no usable list.
+    """
+    found = False
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        prefix = "item" if head.startswith(b"[") else f"{key}.item"
+        for entry in ijson.items(f, prefix):
+            found = True
+            yield entry
+    if found:
+        return
+
+    # Empty list or unexpected layout - small enough to load whole
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        yield from data
+    elif key in data:
+        yield from data[key]
+    elif any_list:
+        for v in data.values():
+            if isinstance(v, list):
+                yield from v
+                break
+    else:
+        raise ValueError(f"Top-level keys found: {list(data.keys())}")
+
+
+def _collect_usernames(entries):
+    """Return the set of usernames in a sequence of JSON entries."""
+    usernames = set()
+    for entry in entries:
+        username = _extract_username(entry)
+        if username:
+            usernames.add(username)
+    return usernames
+
+
 def _check_duplicates_in_list(entries, label):
     """Check for duplicate usernames in a list of JSON entries. Returns (unique_set, duplicates_list)."""
     seen = {}
@@ -47,7 +117,6 @@ def _check_duplicates_in_list(entries, label):
             else:
                 seen[username] = True
     if duplicates:
-        from collections import Counter
         counts = Counter(duplicates)
         print(f"[Duplicates] Found {len(duplicates)} duplicate entries in {label}:")
         for uname, extra_count in counts.most_common():
@@ -73,28 +142,18 @@ def import_from_json(following_json_path, followers_json_path=None, check_duplic
         sys.exit(1)
 
     # Parse following list
-    with open(following_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     # Instagram JSON format: {"relationships_following": [{"string_list_data": [{"value": "username", ...}]}, ...]}
-    if "relationships_following" in data:
-        following_list = data["relationships_following"]
-    elif isinstance(data, list):
-        following_list = data
-    else:
+    following_list = _iter_json_entries(following_path, "relationships_following")
+    try:
+        if check_duplicates:
+            following_usernames, json_dupes = _check_duplicates_in_list(following_list, "following JSON")
+        else:
+            following_usernames = _collect_usernames(following_list)
+    except ValueError as e:
         print("[Error] Unexpected JSON format. Expected 'relationships_following' key.")
-        print(f"  Top-level keys found: {list(data.keys())}")
+        print(f"  {e}")
         sys.exit(1)
 
-    if check_duplicates:
-        following_usernames, json_dupes = _check_duplicates_in_list(following_list, "following JSON")
-    else:
-        following_usernames = set()
-        for entry in following_list:
-            username = _extract_username(entry)
-            if username:
-                following_usernames.add(username)
-
     print(f"[Import] Found {len(following_usernames)} accounts you follow.")
 
     # Parse followers list (optional)
@@ -102,27 +161,12 @@ def import_from_json(following_json_path, followers_json_path=None, check_duplic
     if followers_json_path:
         followers_path = Path(followers_json_path)
         if followers_path.exists():
-            with open(followers_path, "r", encoding="utf-8") as f:
-                fdata = json.load(f)
             # Could be under different keys depending on Instagram version
-            if isinstance(fdata, list):
-                followers_list = fdata
-            elif "relationships_followers" in fdata:
-                followers_list = fdata["relationships_followers"]
-            else:
-                # Try first key that looks like a list
-                followers_list = []
-                for v in fdata.values():
-                    if isinstance(v, list):
-                        followers_list = v
-                        break
+            followers_list = _iter_json_entries(followers_path, "relationships_followers", any_list=True)
             if check_duplicates:
                 followers_usernames, follower_dupes = _check_duplicates_in_list(followers_list, "followers JSON")
             else:
-                for entry in followers_list:
-                    username = _extract_username(entry)
-                    if username:
-                        followers_usernames.add(username)
+                followers_usernames = _collect_usernames(followers_list)
             print(f"[Import] Found {len(followers_usernames)} followers.")
         else:
             print(f"[Import] Followers file not found: {followers_path}")
@@ -140,7 +184,6 @@ def import_from_json(following_json_path, followers_json_path=None, check_duplic
                     csv_duplicates.append(uname)
                 existing[uname] = row
         if check_duplicates and csv_duplicates:
-            from collections import Counter
             counts = Counter(csv_duplicates)
             print(f"[Duplicates] Found {len(csv_duplicates)} duplicate rows in existing CSV:")
             for uname, extra_count in counts.most_common():
@@ -190,10 +233,11 @@ def import_from_json(following_json_path, followers_json_path=None, check_duplic
         writer.writerows(rows)
 
     # Summary
-    keep = sum(1 for r in rows if r["status"] == "keep")
-    unfollow = sum(1 for r in rows if r["status"] == "unfollow")
-    unfollowed = sum(1 for r in rows if r["status"] == STATUS_UNFOLLOWED)
-    blank = sum(1 for r in rows if r["status"] == "")
+    status_counts = tally_statuses(r["status"] for r in rows)
+    keep = status_counts[STATUS_KEEP]
+    unfollow = status_counts[STATUS_UNFOLLOW]
+    unfollowed = status_counts[STATUS_UNFOLLOWED]
+    blank = status_counts[""]
 
     # Show non-mutual info if we have followers data
     if followers_usernames:
@@ -211,3 +255,56 @@ def import_from_json(following_json_path, followers_json_path=None, check_duplic
     print("  3. Leave status blank (or set to 'unfollow') for accounts to remove")
     print("  4. Run: python main.py unfollow --dry-run   (to preview)")
     print("  5. Run: python main.py unfollow              (to execute)")
+
+
+def ensure_on_instagram(driver):
+    """Make sure the current page is on instagram.com so fetch() is same-origin."""
+    if not driver.current_url.startswith("https://www.instagram.com"):
+        driver.get("https://www.instagram.com/")
+
+
+def resolve_user_ids(driver, rows, batch_size=3, pause=2.0):
+    """
+    Fill in the numeric user_id for rows that don't have one yet.
+
+    Looks up batch_size usernames per round (in parallel, inside the
+    logged-in browser) and pauses between rounds to stay under Instagram's
+    rate limits. Stops at the first error response (e.g. 429 rate-limited
+    or 401 logged out) rather than hammering the endpoint. IDs never change,
+    so once stored in the CSV they're reused on every later run.
+
+    Returns False if lookups were stopped by an error, True otherwise.
+    """
+    missing = [r for r in rows if not r.get("user_id")]
+    if not missing:
+        return True
+
+    print(f"[Resolve] Looking up user IDs for {len(missing)} accounts...")
+    ensure_on_instagram(driver)
+
+    resolved = 0
+    ok = True
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        try:
+            results = driver.execute_script(RESOLVE_USER_IDS_JS, [r["username"] for r in batch]) or []
+        except Exception as e:
+            print(f"[Resolve] Lookup failed ({e}). Continuing without IDs.")
+            ok = False
+            break
+        for row, (status, user_id) in zip(batch, results):
+            if user_id:
+                row["user_id"] = user_id
+                resolved += 1
+            if status != 200:
+                ok = False
+        if not ok:
+            bad = next(status for status, _ in results if status != 200)
+            print(f"[Resolve] Instagram answered HTTP {bad or 'error'} - stopping lookups "
+                  "(rate-limited or logged out?). Continuing without IDs.")
+            break
+        if start + batch_size < len(missing):
+            time.sleep(pause)
+
+    print(f"[Resolve] Found {resolved}/{len(missing)} user IDs.")
+    return ok
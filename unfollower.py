@@ -1,4 +1,5 @@
 import csv
+import os
 import random
 import sys
 import time
@@ -16,7 +17,82 @@ from config import (
     DAILY_UNFOLLOW_LIMIT,
     MIN_DELAY_SECONDS,
     MAX_DELAY_SECONDS,
+    CSV_SAVE_EVERY,
+    IG_WEB_APP_ID,
 )
+from scraper import ensure_on_instagram, resolve_user_ids
+from browser import no_implicit_wait
+
+# Profile follow-button locators (matched on the button's full visible text)
+FOLLOWING_BTN_XPATH = "//button[normalize-space()='Following' or normalize-space()='Requested']"
+FOLLOW_BTN_XPATH = "//button[normalize-space()='Follow' or normalize-space()='Follow Back']"
+
+# Finds and clicks "Unfollow" in a single round-trip. Looks inside the
+# confirmation dialog first, then anywhere on the page, polling for up
+# to 5s while the dialog opens (Selenium waits for the Promise).
+CLICK_UNFOLLOW_JS = """
+    var selectors = [
+        'div[role="dialog"] button, div[role="dialog"] div[role="button"]',
+        'button, div, span, a'
+    ];
+    function tryClick() {
+        for (var sel of selectors) {
+            for (var el of document.querySelectorAll(sel)) {
+                if (el.textContent.trim() === 'Unfollow') {
+                    el.click();
+                    return true;
+                }
+            }
+        }
+        return false;
+    }
+    return new Promise(resolve => {
+        var deadline = Date.now() + 5000;
+        (function poll() {
+            if (tryClick()) return resolve(true);
+            if (Date.now() > deadline) return resolve(false);
+            setTimeout(poll, 100);
+        })();
+    });
+"""
+
+# Shared prelude for the API scripts below: igPost(path, body) makes a
+# same-origin POST from the logged-in page, so the browser's cookies are
+# sent, with the headers Instagram's web app uses. Every script passes the
+# app ID as arguments[1]. Selenium waits for the returned Promise to resolve.
+IG_POST_JS = """
+    var csrf = (document.cookie.match(/(?:^|; )csrftoken=([^;]+)/) || [])[1] || '';
+    var appId = arguments[1];
+    function igPost(path, body) {
+        return fetch(path, {
+            method: 'POST',
+            credentials: 'include',
+            headers: {
+                'x-csrftoken': csrf,
+                'x-ig-app-id': appId,
+                'x-requested-with': 'XMLHttpRequest',
+                'content-type': 'application/x-www-form-urlencoded'
+            },
+            body: body
+        }).then(r => r.ok ? r.json() : {});
+    }
+"""
+
+# Unfollow via the endpoint Instagram's web app uses. True only if Instagram
+# says "ok" and the returned friendship_status no longer shows us following.
+UNFOLLOW_XHR_JS = IG_POST_JS + """
+    return igPost('/api/v1/friendships/destroy/' + arguments[0] + '/')
+        .then(j => j.status === 'ok' && !(j.friendship_status || {}).following)
+        .catch(() => false);
+"""
+
+# Friendship status for up to 100 comma-separated user IDs in one request.
+# Returns {user_id: {"following": bool, "outgoing_request": bool, ...}}.
+SHOW_MANY_JS = IG_POST_JS + """
+    return igPost('/api/v1/friendships/show_many/', 'user_ids=' + encodeURIComponent(arguments[0]))
+        .then(j => j.friendship_statuses || {})
+        .catch(() => ({}));
+"""
 
 
 def load_csv():
@@ -30,11 +106,13 @@ def load_csv():
 
 
 def save_csv(rows):
-    """Write all rows back to CSV."""
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
+    """Write all rows back to CSV (via a temp file so a crash can't truncate it)."""
+    tmp_file = CSV_FILE.with_suffix(".tmp")
+    with open(tmp_file, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
         writer.writeheader()
         writer.writerows(rows)
+    os.replace(tmp_file, CSV_FILE)
 
 
 def count_unfollowed_today(rows):
@@ -43,10 +121,38 @@ def count_unfollowed_today(rows):
     return sum(
         1 for r in rows
         if r["status"] == STATUS_UNFOLLOWED
-        and r["date_unfollowed"].startswith(today_str)
+        and r["date_unfollowed"][:10] == today_str
     )
 
 
+def _click_unfollow_by_xpath(driver):
+    """Fallback Unfollow-click strategies using XPath. Returns True if something was clicked."""
+    # Strategy 2: XPath selectors for <button> elements
+    for xpath in [
+        "//*[contains(@role, 'dialog')]//button[text()='Unfollow']",
+        "//*[contains(@role, 'dialog')]//button[contains(text(), 'Unfollow')]",
+        "//button[text()='Unfollow']",
+        "//button[contains(text(), 'Unfollow')]",
+    ]:
+        try:
+            driver.find_element(By.XPATH, xpath).click()
+            return True
+        except Exception:
+            continue
+
+    # Strategy 3: Any clickable element with exact "Unfollow" text (div, span, etc.)
+    try:
+        for el in driver.find_elements(By.XPATH, "//*[text()='Unfollow']"):
+            try:
+                el.click()
+                return True
+            except Exception:
+                continue
+    except Exception:
+        pass
+    return False
+
+
 def _find_and_click_unfollow(driver, username):
     """
     Navigate to a user's profile and unfollow them.
@@ -54,110 +160,231 @@ def _find_and_click_unfollow(driver, username):
     Returns True if unfollowed, False if skipped/failed.
     """
     driver.get(f"https://www.instagram.com/{username}/")
-    time.sleep(3)
 
     # Look for the "Following" button (means we currently follow them)
     # Instagram uses different button text: "Following", "Requested", etc.
-    buttons = driver.find_elements(By.TAG_NAME, "button")
-    following_btn = None
-    for btn in buttons:
-        try:
-            text = btn.text.strip()
-            if text in ("Following", "Requested"):
-                following_btn = btn
-                break
-        except Exception:
-            continue
-
-    if not following_btn:
-        # Check if we already don't follow them
-        for btn in buttons:
-            try:
-                if btn.text.strip() == "Follow":
-                    return "already_unfollowed"
-            except Exception:
-                continue
+    # This always takes priority over "Follow" (suggested-account buttons on
+    # the same page can say "Follow" and may render first).
+    buttons = driver.find_elements(By.XPATH, FOLLOWING_BTN_XPATH)
+    if not buttons:
+        # Check if we already don't follow them; the implicit wait was
+        # already spent above, so don't wait again
+        with no_implicit_wait(driver):
+            if driver.find_elements(By.XPATH, FOLLOW_BTN_XPATH):
+                return "already_unfollowed"
         return "not_found"
+    following_btn = buttons[0]
 
     # Click "Following" to open the unfollow menu/dialog
     following_btn.click()
-    time.sleep(2)
 
     # Find and click "Unfollow" in the menu that appeared.
     # Instagram uses various element types (button, div, span) so we
     # search broadly for anything containing "Unfollow" text.
     unfollow_clicked = False
 
-    # Strategy 1: Any button with "Unfollow" text
-    for xpath in [
-        "//button[text()='Unfollow']",
-        "//button[contains(text(), 'Unfollow')]",
-        "//*[contains(@role, 'dialog')]//button[text()='Unfollow']",
-        "//*[contains(@role, 'dialog')]//button[contains(text(), 'Unfollow')]",
-    ]:
-        try:
-            el = driver.find_element(By.XPATH, xpath)
-            el.click()
-            unfollow_clicked = True
-            break
-        except Exception:
-            continue
+    # Strategy 1: One JavaScript call - dialog buttons first, then any element
+    try:
+        unfollow_clicked = bool(driver.execute_script(CLICK_UNFOLLOW_JS))
+    except Exception:
+        pass
 
-    # Strategy 2: Any clickable element with exact "Unfollow" text (div, span, etc.)
+    # Strategies 2-3: XPath lookups. They only run after the JS has already
+    # polled 5s, so don't let the implicit wait add another 5s per lookup.
     if not unfollow_clicked:
-        try:
-            # Find ALL elements on page, look for "Unfollow" text
-            all_elements = driver.find_elements(By.XPATH, "//*[text()='Unfollow']")
-            for el in all_elements:
-                try:
-                    el.click()
-                    unfollow_clicked = True
-                    break
-                except Exception:
-                    continue
-        except Exception:
-            pass
+        with no_implicit_wait(driver):
+            unfollow_clicked = _click_unfollow_by_xpath(driver)
 
-    # Strategy 3: Use JavaScript to find and click it
     if not unfollow_clicked:
+        return "dialog_failed"
+
+    # The click happened - treat it as success (the button may now read
+    # "Follow" or "Follow Back", so there's nothing reliable to verify against)
+    return "success"
+
+
+def _unfollow_via_xhr(driver, user_id):
+    """
+    Unfollow by calling Instagram's own friendships/destroy endpoint.
+
+    Skips the profile page load entirely. Returns True only if Instagram
+    answered status "ok" and its friendship_status no longer shows us
+    following; False otherwise, including on any HTTP error.
+    """
+    ensure_on_instagram(driver)
+    return bool(driver.execute_script(UNFOLLOW_XHR_JS, user_id, IG_WEB_APP_ID))
+
+
+def bulk_check_following(driver, user_ids, chunk_size=100):
+    """
+    Look up whether we still follow each user ID, 100 IDs per request.
+
+    Returns {user_id: friendship_status} with Instagram's status dicts
+    ("following", "outgoing_request", ...). IDs whose lookup failed are
+    simply missing from the result.
+    """
+    ensure_on_instagram(driver)
+    statuses = {}
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = ",".join(user_ids[start:start + chunk_size])
         try:
-            driver.execute_script("""
-                var elements = document.querySelectorAll('button, div, span, a');
-                for (var el of elements) {
-                    if (el.textContent.trim() === 'Unfollow') {
-                        el.click();
-                        return true;
-                    }
-                }
-                return false;
-            """)
-            unfollow_clicked = True
+            statuses.update(driver.execute_script(SHOW_MANY_JS, chunk, IG_WEB_APP_ID) or {})
         except Exception:
-            pass
+            continue
+    return statuses
 
-    if not unfollow_clicked:
-        return "dialog_failed"
 
-    time.sleep(2)
+def _unfollow(driver, target, following_ids):
+    """
+    Unfollow one CSV row, using the API when possible.
 
-    # Verify: check if the button now says "Follow" (confirming unfollow worked)
-    buttons = driver.find_elements(By.TAG_NAME, "button")
-    for btn in buttons:
+    friendships/destroy answers "ok" whether or not we followed the
+    account, so it can't tell a real unfollow from "already unfollowed".
+    It's only used for user IDs that bulk_check_following just confirmed
+    we follow (following_ids). Everything else, or a rejected request,
+    goes through the profile page, which reports both cases.
+    """
+    if target.get("user_id") in following_ids:
         try:
-            if btn.text.strip() == "Follow":
+            if _unfollow_via_xhr(driver, target["user_id"]):
                 return "success"
         except Exception:
-            continue
+            pass
+    return _find_and_click_unfollow(driver, target["username"])
 
-    # Can't confirm but the click happened - assume success
-    return "success"
+
+def _wait_for_slot(progress):
+    """
+    Block until the next turn on the pacing schedule.
+
+    Turns are spaced random.uniform(MIN_DELAY_SECONDS, MAX_DELAY_SECONDS)
+    apart, measured from when the previous action started, so time spent
+    loading pages counts toward the delay instead of adding to it.
+    """
+    now = time.monotonic()
+    slot = max(now, progress["next_slot"])
+    progress["next_slot"] = slot + random.uniform(MIN_DELAY_SECONDS, MAX_DELAY_SECONDS)
+    delay = slot - now
+    if delay >= 1:
+        print(f"  Waiting {delay:.0f}s...")
+    time.sleep(delay)
+
+
+def unfollow_worker(driver, targets, rows, progress):
+    """
+    Unfollow each account in targets, updating its CSV row and the
+    session counters in progress. Returns early if the session expires.
+    """
+    for target in targets:
+        _wait_for_slot(progress)
+        username = target["username"]
+
+        try:
+            result = _unfollow(driver, target, progress["following_ids"])
+
+            if result == "success":
+                target["status"] = STATUS_UNFOLLOWED
+                message = "OK"
+            elif result == "already_unfollowed":
+                target["status"] = STATUS_UNFOLLOWED
+                message = "ALREADY UNFOLLOWED (marked done)"
+            elif result == "not_found":
+                target["status"] = STATUS_SKIPPED
+                message = "SKIPPED (account no longer exists)"
+            else:  # dialog_failed
+                target["status"] = STATUS_SKIPPED
+                message = "SKIPPED (unfollow dialog issue)"
+
+        except Exception as e:
+            result = "error"
+            target["status"] = STATUS_SKIPPED
+            message = f"ERROR: {e}"
+
+        target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
+
+        progress["done"] += 1
+        if result == "success":
+            progress["unfollowed"] += 1
+        elif target["status"] == STATUS_SKIPPED:
+            progress["skipped"] += 1
+        print(f"[{progress['done']}/{progress['total']}] @{username}: {message}")
+
+        # Save periodically (run_unfollow's finally block covers the rest)
+        if progress["done"] % CSV_SAVE_EVERY == 0:
+            save_csv(rows)
+
+        # Check if we got logged out
+        if result == "error" and "login" in driver.current_url:
+            print("[Unfollow] Got redirected to login page. Session may have expired.")
+            print("  Saving progress. Re-run 'python main.py login' then try again.")
+            progress["logged_out"] = True
+            return
+
+
+def _fill_queue(driver, targets, budget):
+    """
+    Take up to budget accounts from targets that still need unfollowing.
+
+    Works one batch at a time: resolves missing user IDs, then bulk-checks
+    friendship status. Accounts that turn out to be already unfollowed
+    (e.g. by hand in the app) are marked unfollowed with a blank
+    date_unfollowed, so they don't use up today's budget, and the next
+    targets in line take their place.
+
+    Returns (to_process, following_ids, already_done), where following_ids
+    are the IDs confirmed as still followed (safe for the XHR path).
+    """
+    to_process = []
+    following_ids = set()
+    already_done = 0
+    pos = 0
+    lookups_ok = True
+    while len(to_process) < budget and pos < len(targets):
+        batch = targets[pos:pos + budget - len(to_process)]
+        pos += len(batch)
+        # Once Instagram refuses a lookup, don't keep retrying on every batch
+        if lookups_ok:
+            lookups_ok = resolve_user_ids(driver, batch)
+        statuses = bulk_check_following(driver, [r["user_id"] for r in batch if r.get("user_id")])
+        for r in batch:
+            fs = statuses.get(r.get("user_id"))
+            if fs is None:
+                to_process.append(r)  # unknown - let the profile flow decide
+            elif fs.get("following") or fs.get("outgoing_request"):
+                following_ids.add(r["user_id"])
+                to_process.append(r)
+            else:
+                r["status"] = STATUS_UNFOLLOWED
+                r["date_unfollowed"] = ""
+                already_done += 1
+    return to_process, following_ids, already_done
+
+
+def _print_plan(mode_label, targets, non_followers, mutuals, to_process, remaining_budget):
+    """Print the summary of what this run is going to process."""
+    non_f_count = sum(1 for r in to_process if r.get("follows_you", "") == "no")
+    mutual_count = sum(1 for r in to_process if r.get("follows_you", "") == "yes")
+    other_count = len(to_process) - non_f_count - mutual_count
+
+    print(f"[Unfollow] Mode: {mode_label}")
+    print(f"  Eligible: {len(targets)} accounts ({len(non_followers)} non-followers, {len(mutuals)} mutuals)")
+    print(f"  Will process: {len(to_process)} today (budget: {remaining_budget})")
+    if non_f_count:
+        print(f"    Non-followers: {non_f_count}")
+    if mutual_count:
+        print(f"    Mutuals (not keep): {mutual_count}")
+    if other_count:
+        print(f"    Other: {other_count}")
 
 
 def run_unfollow(driver, dry_run=False, mode=None):
     """
     Unfollow accounts marked 'unfollow' (or blank) in CSV.
 
-    Uses Selenium to visit each profile and click the unfollow button.
+    Resolves user IDs and drops accounts already unfollowed (see _fill_queue),
+    then unfollows each remaining account through Instagram's friendships
+    endpoint, falling back to visiting the profile and clicking the
+    unfollow button when that isn't possible.
 
     mode:
       None              - all eligible (non-followers first, then mutuals)
@@ -174,16 +401,16 @@ def run_unfollow(driver, dry_run=False, mode=None):
               f"Already unfollowed {already_today} today. Try again tomorrow.")
         return
 
-    # Build work queue: blank or "unfollow" status
-    all_targets = [
-        r for r in rows
-        if r["status"] in (STATUS_UNFOLLOW, "")
-    ]
+    # Build work queue (blank or "unfollow" status), bucketed by follows_you
+    buckets = {"no": [], "yes": [], "?": []}
+    for r in rows:
+        if r["status"] not in (STATUS_UNFOLLOW, ""):
+            continue
+        fy = r.get("follows_you", "")
+        buckets[fy if fy in ("yes", "no") else "?"].append(r)
+    non_followers, mutuals, unknown = buckets["no"], buckets["yes"], buckets["?"]
 
     # Filter by mode
-    non_followers = [r for r in all_targets if r.get("follows_you", "") == "no"]
-    mutuals = [r for r in all_targets if r.get("follows_you", "") == "yes"]
-
     if mode == "non_followers":
         targets = non_followers
         mode_label = "non-followers only"
@@ -192,33 +419,17 @@ def run_unfollow(driver, dry_run=False, mode=None):
         mode_label = "mutual follows (not keep) only"
     else:
         # Default: non-followers first, then mutuals
-        targets = non_followers + mutuals
         # Add any with unknown follows_you status at the end
-        unknown = [r for r in all_targets if r.get("follows_you", "") not in ("yes", "no")]
-        targets = targets + unknown
+        targets = non_followers + mutuals + unknown
         mode_label = "all (non-followers first)"
 
     if not targets:
         print(f"[Unfollow] No accounts to unfollow for mode: {mode_label}.")
         return
 
-    to_process = targets[:remaining_budget]
-
-    non_f_count = sum(1 for r in to_process if r.get("follows_you", "") == "no")
-    mutual_count = sum(1 for r in to_process if r.get("follows_you", "") == "yes")
-    other_count = len(to_process) - non_f_count - mutual_count
-
-    print(f"[Unfollow] Mode: {mode_label}")
-    print(f"  Eligible: {len(targets)} accounts ({len(non_followers)} non-followers, {len(mutuals)} mutuals)")
-    print(f"  Will process: {len(to_process)} today (budget: {remaining_budget})")
-    if non_f_count:
-        print(f"    Non-followers: {non_f_count}")
-    if mutual_count:
-        print(f"    Mutuals (not keep): {mutual_count}")
-    if other_count:
-        print(f"    Other: {other_count}")
-
     if dry_run:
+        to_process = targets[:remaining_budget]
+        _print_plan(mode_label, targets, non_followers, mutuals, to_process, remaining_budget)
         print("\n[Dry Run] Would unfollow:")
         for t in to_process:
             fy = t.get("follows_you", "")
@@ -232,67 +443,40 @@ def run_unfollow(driver, dry_run=False, mode=None):
         print(f"\n[Dry Run] Total: {len(to_process)} accounts")
         return
 
-    unfollowed_count = 0
-    skipped_count = 0
-    for i, target in enumerate(to_process):
-        username = target["username"]
-
-        print(f"[{i+1}/{len(to_process)}] Unfollowing @{username}...", end=" ", flush=True)
-
-        try:
-            result = _find_and_click_unfollow(driver, username)
-
-            if result == "success":
-                target["status"] = STATUS_UNFOLLOWED
-                target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
-                unfollowed_count += 1
-                print("OK")
-
-            elif result == "already_unfollowed":
-                target["status"] = STATUS_UNFOLLOWED
-                target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
-                print("ALREADY UNFOLLOWED (marked done)")
-
-            elif result == "not_found":
-                target["status"] = STATUS_SKIPPED
-                target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
-                print("SKIPPED (account no longer exists)")
-                skipped_count += 1
-
-            elif result == "dialog_failed":
-                target["status"] = STATUS_SKIPPED
-                target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
-                print("SKIPPED (unfollow dialog issue)")
-                skipped_count += 1
-
-        except KeyboardInterrupt:
-            print("\n[Unfollow] Interrupted by user. Saving progress...")
-            save_csv(rows)
-            print(f"  Unfollowed {unfollowed_count} this session.")
-            sys.exit(0)
-
-        except Exception as e:
-            print(f"ERROR: {e}")
-            target["status"] = STATUS_SKIPPED
-            target["date_unfollowed"] = datetime.now().isoformat(timespec="seconds")
-            skipped_count += 1
-            # Check if we got logged out
-            if "login" in driver.current_url:
-                print("[Unfollow] Got redirected to login page. Session may have expired.")
-                print("  Saving progress. Re-run 'python main.py login' then try again.")
-                save_csv(rows)
-                return
-
-        # Save after each action (crash safety)
+    progress = {
+        "total": 0,
+        "done": 0,
+        "unfollowed": 0,
+        "skipped": 0,
+        "logged_out": False,
+        "next_slot": 0.0,
+        "following_ids": set(),
+    }
+    try:
+        # ID lookups can take minutes, so they're covered by the same
+        # Ctrl+C handling and final save as the unfollow loop
+        to_process, progress["following_ids"], already_done = _fill_queue(driver, targets, remaining_budget)
+        save_csv(rows)  # cache resolved user IDs and already-unfollowed rows
+        if already_done:
+            print(f"[Unfollow] {already_done} accounts were already unfollowed (marked done, not counted toward today's limit).")
+
+        _print_plan(mode_label, targets, non_followers, mutuals, to_process, remaining_budget)
+        progress["total"] = len(to_process)
+        unfollow_worker(driver, to_process, rows, progress)
+
+    except KeyboardInterrupt:
+        print("\n[Unfollow] Interrupted by user. Saving progress...")
+        print(f"  Unfollowed {progress['unfollowed']} this session.")
+        sys.exit(0)
+
+    finally:
+        # Flush whatever hasn't been written yet (normal end, interrupt, or crash)
         save_csv(rows)
 
-        # Random delay before next unfollow (skip after last one)
-        if i < len(to_process) - 1:
-            delay = random.uniform(MIN_DELAY_SECONDS, MAX_DELAY_SECONDS)
-            print(f"  Waiting {delay:.0f}s...")
-            time.sleep(delay)
+    if progress["logged_out"]:
+        return
 
-    print(f"\n[Unfollow] Done. Unfollowed {unfollowed_count}, skipped {skipped_count} this session.")
+    print(f"\n[Unfollow] Done. Unfollowed {progress['unfollowed']}, skipped {progress['skipped']} this session.")
     remaining = sum(1 for r in rows if r["status"] in (STATUS_UNFOLLOW, ""))
     if remaining:
         print(f"  {remaining} accounts still pending. Run again tomorrow if you hit the limit.")